@@ -1,10 +1,21 @@
+import asyncio
+import atexit
+import heapq
+import json
+import math
+import operator
+import queue
+import signal
 import time
 import os
 import csv
 import datetime
 import threading
+import traceback
+from bisect import bisect_right
 from collections import deque
-from statistics import median, stdev
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.panel import Panel
@@ -25,6 +36,7 @@ ROLLING_WINDOW = int(os.getenv("MR_WINDOW", "15"))
 DEVIATION_THRESHOLD_PCT = float(os.getenv("MR_THRESHOLD", "5.0"))  # percent (base)
 MAX_HOLD_SECONDS = int(os.getenv("MR_MAX_HOLD", str(60 * 60)))  # 1 hour
 REFRESH_RATE = float(os.getenv("MR_REFRESH", "2"))
+MARKET_META_TTL = int(os.getenv("MR_META_TTL", "30"))  # reconcile cadence when streaming
 
 # Liquidity filtering parameters
 MIN_OPEN_INTEREST = int(os.getenv("MIN_OPEN_INTEREST", "100"))  # min shares
@@ -32,6 +44,7 @@ MAX_SPREAD_PCT = float(os.getenv("MAX_SPREAD_PCT", "2.0"))  # max spread %
 
 # Entry logic parameters
 HOURS_BEFORE_CLOSE = int(os.getenv("HOURS_BEFORE_CLOSE", "2"))  # don't enter this close to close
+HOURS_BEFORE_CLOSE_SEC = HOURS_BEFORE_CLOSE * 3600
 
 # Safety parameters
 MIN_HOLD_TIME = 30
@@ -43,41 +56,32 @@ BREAK_EVEN_TIMER = 1800      # 30 min
 
 console = Console(force_terminal=True, legacy_windows=False, width=160)
 
-# Global flag for manual sell trigger
-manual_sell_requested = False
-manual_sell_ticker = None
+# Keyboard commands flow through a single-producer/single-consumer queue; the
+# main loop drains it once per tick, so every keypress is handled exactly once
+# (a shared boolean could drop a second 's' pressed before the loop cleared it)
+cmd_q = queue.SimpleQueue()
 
 def listen_for_input():
     """Listen for keyboard commands: 's' to sell, 'c' to cancel orders, 'q' to quit."""
-    global manual_sell_requested, manual_sell_ticker
     import sys
-    import select
     
     console.print("[dim]Keyboard shortcuts: s=sell all, c=cancel orders, q=quit[/dim]")
     
-    # On Windows, use a simpler approach
+    # On Windows, block on getwch instead of polling kbhit ten times a second
     if sys.platform == 'win32':
         import msvcrt
         while True:
             try:
-                if msvcrt.kbhit():
-                    key = msvcrt.getch().decode('utf-8').lower()
-                    if key == 's':
-                        manual_sell_requested = True
-                        console.print("[yellow]>> Manual sell requested for all positions[/yellow]")
-                    elif key == 'c':
-                        # Cancel all open orders
-                        open_orders = get_all_open_orders()
-                        canceled = 0
-                        for order in open_orders:
-                            order_id = getattr(order, 'order_id', None)
-                            if order_id and cancel_order(order_id):
-                                canceled += 1
-                        console.print(f"[yellow]X Canceled {canceled}/{len(open_orders)} orders[/yellow]")
-                    elif key == 'q':
-                        console.print("[yellow]Exiting...[/yellow]")
-                        break
-                time.sleep(0.1)
+                key = msvcrt.getwch().lower()  # blocks until a key arrives
+                if key == 's':
+                    cmd_q.put("sell_all")
+                    console.print("[yellow]>> Manual sell requested for all positions[/yellow]")
+                elif key == 'c':
+                    cmd_q.put("cancel_orders")
+                elif key == 'q':
+                    cmd_q.put("quit")
+                    console.print("[yellow]Exiting...[/yellow]")
+                    break
             except Exception as e:
                 time.sleep(0.1)
     else:
@@ -86,17 +90,12 @@ def listen_for_input():
             try:
                 user_input = input().strip().lower()
                 if user_input == 's':
-                    manual_sell_requested = True
+                    cmd_q.put("sell_all")
                     console.print("[yellow]>> Manual sell requested for all positions[/yellow]")
                 elif user_input == 'c':
-                    open_orders = get_all_open_orders()
-                    canceled = 0
-                    for order in open_orders:
-                        order_id = getattr(order, 'order_id', None)
-                        if order_id and cancel_order(order_id):
-                            canceled += 1
-                    console.print(f"[yellow]X Canceled {canceled}/{len(open_orders)} orders[/yellow]")
+                    cmd_q.put("cancel_orders")
                 elif user_input == 'q':
+                    cmd_q.put("quit")
                     console.print("[yellow]Exiting...[/yellow]")
                     break
             except EOFError:
@@ -119,56 +118,387 @@ try:
 except Exception as e:
     console.print(f"[yellow]Warning: Kalshi client not configured: {e}[/yellow]")
 
+# Optional push-driven market data: stream prices over Kalshi's WebSocket
+# channel so stop checks react at message latency instead of the 2s REST poll.
+# Falls back to REST-only polling when the websockets package is unavailable.
+WS_URL = os.getenv("KALSHI_WS_URL", "wss://stream.kalshi.com/v1")
+WS_STALE_SECONDS = float(os.getenv("MR_WS_STALE", str(REFRESH_RATE * 2)))
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+ws_prices = {}  # ticker -> {"bid": float, "ask": float, "ts": float}
+_ws_lock = threading.Lock()
+_ws_tickers = set()
+_ws_resubscribe = threading.Event()
+
+
+def update_ws_tickers(tickers):
+    """Tells the feed which tickers to stream; resubscribes when the set changes."""
+    global _ws_tickers
+    tickers = set(tickers)
+    with _ws_lock:
+        if tickers != _ws_tickers:
+            _ws_tickers = tickers
+            _ws_resubscribe.set()
+
+
+def get_ws_quote(ticker):
+    """Returns a fresh (bid, ask) from the stream, or None if stale/absent."""
+    quote = ws_prices.get(ticker)
+    if quote and time.time() - quote["ts"] <= WS_STALE_SECONDS:
+        return quote["bid"], quote["ask"]
+    return None
+
+
+async def _ws_feed():
+    """Streams ticker updates for the held markets into ws_prices."""
+    sub_id = 0
+    while True:
+        with _ws_lock:
+            tickers = sorted(_ws_tickers)
+        _ws_resubscribe.clear()
+        if not tickers:
+            await asyncio.sleep(1)
+            continue
+        try:
+            async with websockets.connect(WS_URL) as ws:
+                sub_id += 1
+                await ws.send(json.dumps({
+                    "id": sub_id,
+                    "cmd": "subscribe",
+                    "params": {"channels": ["ticker"], "market_tickers": tickers},
+                }))
+                while not _ws_resubscribe.is_set():
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), timeout=1)
+                    except asyncio.TimeoutError:
+                        continue
+                    msg = json.loads(raw)
+                    if msg.get("type") != "ticker":
+                        continue
+                    data = msg.get("msg", {})
+                    ticker = data.get("market_ticker")
+                    bid = data.get("yes_bid")
+                    ask = data.get("yes_ask")
+                    # A partial message (missing or zero prices) must not
+                    # become a $0.00 quote — that would read as a crashed
+                    # price and trip the stop loss. Skip it and let the REST
+                    # fallback serve the tick instead.
+                    if not ticker or not bid or not ask:
+                        continue
+                    ws_prices[ticker] = {
+                        "bid": float(bid) / 100,  # cents
+                        "ask": float(ask) / 100,
+                        "ts": time.time(),
+                    }
+        except Exception:
+            await asyncio.sleep(5)  # connection dropped/refused; retry
+
+
+if websockets is not None and client is not None:
+    threading.Thread(target=lambda: asyncio.run(_ws_feed()), daemon=True).start()
+elif client is not None:
+    console.print("[yellow]Warning: websockets not installed; REST polling only[/yellow]")
+
+
+class RollingMedian:
+    """Rolling median over a fixed-size window in O(log n) per sample.
+
+    The lower half of the window lives in a max-heap and the upper half in a
+    min-heap, so the median is read off the heap tops in O(1). Entries that
+    slide out of the window are removed lazily: their sequence numbers are
+    marked expired and discarded whenever they surface at a heap top.
+    """
+
+    def __init__(self, window):
+        self.window = deque(maxlen=window)  # (value, seq) pairs in arrival order
+        self._lo = []  # max-heap of the lower half, entries (-value, seq)
+        self._hi = []  # min-heap of the upper half, entries (value, seq)
+        self._side = {}  # seq -> which heap the live entry is in (-1 lo, +1 hi)
+        self._lo_size = 0  # live entries only; heaps may also hold expired ones
+        self._hi_size = 0
+        self._expired = set()  # seqs evicted but still physically in a heap
+        self._seq = 0
+        # Welford running stats over the same window, so mean/stdev for the
+        # volatility threshold are O(1) reads instead of a rescan
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.cached_threshold = None  # memoized by calculate_dynamic_threshold
+
+    def __len__(self):
+        return len(self.window)
+
+    def __iter__(self):
+        return (value for value, _ in self.window)
+
+    def push(self, value):
+        """Appends a sample, evicting the oldest once the window is full."""
+        if len(self.window) == self.window.maxlen:
+            old_value, old_seq = self.window[0]
+            self._expired.add(old_seq)
+            if self._side.pop(old_seq) < 0:
+                self._lo_size -= 1
+            else:
+                self._hi_size -= 1
+            self._remove_stat(old_value)
+        self._seq += 1
+        seq = self._seq
+        self.window.append((value, seq))
+        self._add_stat(value)
+        self.cached_threshold = None  # stats changed; recompute on next read
+
+        self._prune()
+        if self._lo and value <= -self._lo[0][0]:
+            heapq.heappush(self._lo, (-value, seq))
+            self._side[seq] = -1
+            self._lo_size += 1
+        else:
+            heapq.heappush(self._hi, (value, seq))
+            self._side[seq] = 1
+            self._hi_size += 1
+        self._rebalance()
+        # Expired entries buried below the heap tops (e.g. during a monotonic
+        # price run the evicted minimum never surfaces) would otherwise pile
+        # up forever; rebuild from the live window once they dominate
+        if len(self._lo) + len(self._hi) > 4 * len(self.window):
+            self._compact()
+
+    def _compact(self):
+        entries = sorted((value, seq) for value, seq in self.window)
+        half = (len(entries) + 1) // 2
+        self._lo = [(-value, seq) for value, seq in entries[:half]]
+        self._hi = entries[half:]
+        heapq.heapify(self._lo)
+        heapq.heapify(self._hi)
+        self._side = {seq: -1 for _, seq in entries[:half]}
+        self._side.update((seq, 1) for _, seq in entries[half:])
+        self._lo_size = half
+        self._hi_size = len(entries) - half
+        self._expired.clear()
+
+    @property
+    def mean(self):
+        return self._mean
+
+    def stdev(self):
+        """Sample standard deviation of the window (0.0 below 2 samples)."""
+        n = len(self.window)
+        if n < 2:
+            return 0.0
+        return math.sqrt(max(self._m2, 0.0) / (n - 1))
+
+    def _add_stat(self, value):
+        # Welford update; called after the value is appended to the window
+        n = len(self.window)
+        delta = value - self._mean
+        self._mean += delta / n
+        self._m2 += delta * (value - self._mean)
+
+    def _remove_stat(self, value):
+        # Welford downdate; called while the evictee is still in the window
+        n = len(self.window)
+        if n == 1:
+            self._mean = 0.0
+            self._m2 = 0.0
+            return
+        old_mean = self._mean
+        self._mean = (n * old_mean - value) / (n - 1)
+        self._m2 -= (value - old_mean) * (value - self._mean)
+
+    def median(self):
+        """Returns the window median in O(1) amortized."""
+        if not self.window:
+            return 0.0
+        self._prune()
+        if len(self.window) % 2:
+            return -self._lo[0][0]
+        return (-self._lo[0][0] + self._hi[0][0]) / 2
+
+    def _rebalance(self):
+        # Keep the halves within one element of each other, lower half larger
+        while self._lo_size > self._hi_size + 1:
+            self._prune()
+            neg_value, seq = heapq.heappop(self._lo)
+            heapq.heappush(self._hi, (-neg_value, seq))
+            self._side[seq] = 1
+            self._lo_size -= 1
+            self._hi_size += 1
+        while self._hi_size > self._lo_size:
+            self._prune()
+            value, seq = heapq.heappop(self._hi)
+            heapq.heappush(self._lo, (-value, seq))
+            self._side[seq] = -1
+            self._hi_size -= 1
+            self._lo_size += 1
+
+    def _prune(self):
+        # Drop evicted entries sitting at either heap top
+        while self._lo and self._lo[0][1] in self._expired:
+            self._expired.discard(heapq.heappop(self._lo)[1])
+        while self._hi and self._hi[0][1] in self._expired:
+            self._expired.discard(heapq.heappop(self._hi)[1])
+
+
+@dataclass(slots=True)
+class PositionState:
+    """Per-ticker tracking state, consolidated into a single dict lookup."""
+    rolling: RollingMedian
+    entry_time: float
+    peak: float
+
+
+# Pre-rendered sparkline tokens: every color/char combination is immutable,
+# so build them once instead of f-string formatting per sample per tick
+_SPARK_CHARS = " ▁▂▃▄▅▆▇█"
+_SPARK_TOKENS = {
+    color: tuple(f"[{color}]{ch}[/{color}]" for ch in _SPARK_CHARS)
+    for color in ("green", "red", "yellow", "cyan")
+}
+
+
+# Position attribute names vary across SDK versions. Resolve them once from
+# the first position seen and bind C-level attrgetters, instead of paying the
+# nested getattr-with-default chains on every position every tick.
+_pos_ticker = None
+_pos_cost = None
+
+
+def _bind_position_getters(pos):
+    """Picks the right SDK attribute names from a sample position."""
+    global _pos_ticker, _pos_cost
+    _pos_ticker = operator.attrgetter(
+        'ticker' if hasattr(pos, 'ticker') else 'event_ticker')
+    _pos_cost = operator.attrgetter(
+        'market_exposure' if hasattr(pos, 'market_exposure') else 'total_cost')
+
 
 def get_sparkline(prices):
     """Generates a tiny bar graph using Unicode block characters with color."""
-    if len(prices) < 2: 
+    if len(prices) < 2:
         return " "
-    chars = " ▁▂▃▄▅▆▇█"
     min_p, max_p = min(prices), max(prices)
     diff = max_p - min_p
-    if diff == 0: 
+    if diff == 0:
         return "[dim]▄" * len(prices) + "[/dim]"
-    
-    line = ""
-    for i, p in enumerate(prices):
-        idx = int(((p - min_p) / diff) * 8)
-        idx = min(idx, 7)
-        
-        # Color gradient based on trend
-        if i < len(prices) - 1:
-            if prices[i+1] > p:
-                color = "green"
-            elif prices[i+1] < p:
-                color = "red"
-            else:
-                color = "yellow"
-        else:
-            color = "cyan"
-        
-        line += f"[{color}]{chars[idx]}[/{color}]"
-    return line
 
+    # Single pass: each bar is colored by the direction of the next sample,
+    # with the newest sample drawn cyan
+    scale = 8 / diff
+    parts = []
+    it = iter(prices)
+    p = next(it)
+    for nxt in it:
+        idx = min(int((p - min_p) * scale), 7)
+        color = "green" if nxt > p else ("red" if nxt < p else "yellow")
+        parts.append(_SPARK_TOKENS[color][idx])
+        p = nxt
+    parts.append(_SPARK_TOKENS["cyan"][min(int((p - min_p) * scale), 7)])
+    return "".join(parts)
 
-def get_stats():
-    """Calculates win rate and PnL from the log file."""
-    total_pnl = 0.0
-    wins, total_trades = 0, 0
-    if not os.path.isfile(LOG_FILE): 
-        return 0.0, 0.0
-    with open(LOG_FILE, mode="r") as f:
-        reader = csv.DictReader(f)
+
+# Running trade stats, seeded from the log file once at startup and updated
+# incrementally by log_trade so the dashboard never re-scans the CSV.
+_stats_lock = threading.Lock()
+_pnl_total = 0.0
+_wins = 0
+_trades = 0
+
+
+def _init_stats():
+    """Seeds the running stats counters with one pass over the log file."""
+    global _pnl_total, _wins, _trades
+    if not os.path.isfile(LOG_FILE):
+        return
+    with open(LOG_FILE, mode="r", newline="") as f:
+        # Plain csv.reader with positional indexes: no per-row dict
+        # allocation or column-name hashing like DictReader does
+        reader = csv.reader(f)
+        try:
+            header = next(reader)
+            exit_idx = header.index("Exit")
+            pnl_idx = header.index("PnL%")
+        except (StopIteration, ValueError):
+            return  # empty file or unrecognized header
         for row in reader:
             try:
-                p_val = float(row['PnL%'].replace('%', ''))
-                total_pnl += p_val
-                total_trades += 1
-                if p_val > 0: 
-                    wins += 1
-            except: 
-                continue
-    win_rate = (wins / total_trades * 100) if total_trades > 0 else 0
-    return total_pnl, win_rate
+                # Skip NEW POSITION announcement rows — only closed trades count
+                if row[exit_idx] == '---':
+                    continue
+                # Our writer always emits "<float>%", so slicing off the last
+                # char is enough — no need to scan the string with replace()
+                p_val = float(row[pnl_idx][:-1])
+                _pnl_total += p_val
+                _trades += 1
+                if p_val > 0:
+                    _wins += 1
+            except (ValueError, IndexError):
+                continue  # malformed row; skip it
+
+
+def get_stats():
+    """Returns cumulative PnL and win rate from the cached counters."""
+    with _stats_lock:
+        win_rate = (_wins / _trades * 100) if _trades > 0 else 0
+        return _pnl_total, win_rate
+
+
+_init_stats()
+
+# Persistent log handle: open once (block-buffered) instead of re-opening the
+# file for every trade event; the header is written once if the file is new.
+# Writes land in the OS page cache and are flushed on exit/SIGTERM plus a
+# periodic heartbeat, rather than syncing every row.
+LOG_FLUSH_INTERVAL = 30  # seconds
+
+_LOG_HEADER = ["Timestamp", "Ticker", "Event", "Entry", "Exit", "PnL%", "Reason"]
+_log_fh = open(LOG_FILE, mode="a", newline="")
+_log_writer = csv.writer(_log_fh)
+if _log_fh.tell() == 0:
+    _log_writer.writerow(_LOG_HEADER)
+atexit.register(_log_fh.close)
+
+# Rows logged during a tick are buffered and written with one writerows call
+# at the end of the tick, so a burst of fills costs a single bulk append
+_pending_log_rows = []
+
+
+def _flush_log_rows():
+    """Writes any buffered log rows in one bulk append."""
+    if _pending_log_rows:
+        # Rows carry a raw epoch timestamp; format them here, off the trading
+        # path, instead of paying strftime at every log call
+        for row in _pending_log_rows:
+            row[0] = time.strftime("%Y-%m-%d %I:%M:%S %p", time.localtime(row[0]))
+        _log_writer.writerows(_pending_log_rows)
+        _pending_log_rows.clear()
+
+
+atexit.register(_flush_log_rows)  # registered after close, so it runs first
+
+
+def _on_sigterm(signum, frame):
+    _flush_log_rows()
+    _log_fh.flush()
+    raise SystemExit(0)
+
+
+try:
+    signal.signal(signal.SIGTERM, _on_sigterm)
+except ValueError:
+    pass  # not in the main thread (e.g. imported from a worker)
+
+
+def _heartbeat_flush():
+    _log_fh.flush()
+    timer = threading.Timer(LOG_FLUSH_INTERVAL, _heartbeat_flush)
+    timer.daemon = True
+    timer.start()
+
+
+_heartbeat_flush()
 
 
 def is_market_liquid(market, yes_bid, yes_ask):
@@ -189,6 +519,11 @@ def is_market_liquid(market, yes_bid, yes_ask):
         return False
 
 
+# Parsed close times keyed by the raw ISO string — immutable per market, so
+# the fromisoformat cost is paid once instead of per position per tick
+_close_time_cache = {}
+
+
 def is_market_active_for_entry(market):
     """Check if market is suitable for new entries (not too close to close)."""
     try:
@@ -197,13 +532,17 @@ def is_market_active_for_entry(market):
         if not close_time_str:
             return True
         
-        # Parse close time (ISO format)
-        close_time = datetime.datetime.fromisoformat(close_time_str.replace('Z', '+00:00'))
+        # Parse close time (ISO format), memoized on the raw string
+        close_time = _close_time_cache.get(close_time_str)
+        if close_time is None:
+            close_time = datetime.datetime.fromisoformat(close_time_str.replace('Z', '+00:00'))
+            if len(_close_time_cache) >= 1024:
+                _close_time_cache.clear()  # cheap bound; repopulates instantly
+            _close_time_cache[close_time_str] = close_time
         now = datetime.datetime.now(datetime.timezone.utc)
-        time_to_close = (close_time - now).total_seconds() / 3600  # hours
         
         # Don't enter if too close to close
-        if time_to_close < HOURS_BEFORE_CLOSE:
+        if (close_time - now).total_seconds() < HOURS_BEFORE_CLOSE_SEC:
             return False
         
         return True
@@ -211,55 +550,94 @@ def is_market_active_for_entry(market):
         return True  # If we can't determine, allow entry
 
 
-def calculate_dynamic_threshold(prices):
+def calculate_dynamic_threshold(window):
     """Calculate volatility-based threshold adjustment."""
-    if len(prices) < 3:
+    if len(window) < 3:
         return DEVIATION_THRESHOLD_PCT
     
-    try:
-        # Calculate coefficient of variation (volatility)
-        price_list = list(prices)
-        
-        mean_price = sum(price_list) / len(price_list)
-        volatility = stdev(price_list) / mean_price if mean_price > 0 else 0
+    # Memoized on the window and invalidated by push, so repeat reads within
+    # a tick are a single attribute load
+    threshold = window.cached_threshold
+    if threshold is None:
+        # Coefficient of variation from the window's running Welford stats —
+        # no list materialization or rescan of the prices
+        mean_price = window.mean
+        volatility = window.stdev() / mean_price if mean_price > 0 else 0
         
         # Adjust threshold: higher volatility = higher threshold needed
-        volatility_pct = volatility * 100
-        adjusted_threshold = DEVIATION_THRESHOLD_PCT * (1 + (volatility_pct / 100) * 1.0)
-        
-        return adjusted_threshold
-    except:
-        return DEVIATION_THRESHOLD_PCT
+        threshold = window.cached_threshold = DEVIATION_THRESHOLD_PCT * (1 + volatility)
+    return threshold
 
 
 def log_trade(ticker, title, entry, exit_price, pnl_pct, reason):
     """Saves trade data to CSV."""
-    file_exists = os.path.isfile(LOG_FILE)
-    with open(LOG_FILE, mode="a", newline="") as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(["Timestamp", "Ticker", "Event", "Entry", "Exit", "PnL%", "Reason"])
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %I:%M:%S %p")
-        writer.writerow([timestamp, ticker, title, f"${entry:.2f}", f"${exit_price:.2f}", f"{pnl_pct:.1f}%", reason])
+    _pending_log_rows.append([time.time(), ticker, title, f"${entry:.2f}", f"${exit_price:.2f}", f"{pnl_pct:.1f}%", reason])
+
+    global _pnl_total, _wins, _trades
+    with _stats_lock:
+        _pnl_total += pnl_pct
+        _trades += 1
+        if pnl_pct > 0:
+            _wins += 1
 
 
 def log_new_position(ticker, title, entry, shares):
     """Logs when a new position is detected."""
-    file_exists = os.path.isfile(LOG_FILE)
-    with open(LOG_FILE, mode="a", newline="") as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(["Timestamp", "Ticker", "Event", "Entry", "Exit", "PnL%", "Reason"])
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %I:%M:%S %p")
-        writer.writerow([timestamp, ticker, title, f"${entry:.2f}", "---", "0.0%", f"NEW POSITION ({shares} shares)"])
-    
+    _pending_log_rows.append([time.time(), ticker, title, f"${entry:.2f}", "---", "0.0%", f"NEW POSITION ({shares} shares)"])
+
     console.print(f"\n[bold green]NEW POSITION DETECTED![/bold green]")
     console.print(f"[cyan]{title}[/cyan]")
     console.print(f"[white]Entry: ${entry:.2f} | Shares: {shares}[/white]")
     console.print(f"[dim]ker: {ticker}[/dim]\n")
 
 
-def execute_order(ticker, shares, reason, action="sell"):
+# Order audit logs: one O_APPEND descriptor per file for the process lifetime,
+# opened on first use so empty files aren't created needlessly. POSIX appends
+# of this size are atomic, so each entry is a single os.write syscall instead
+# of an open/write/close round-trip per order.
+_audit_fds = {}
+
+
+def _append_log(path, text):
+    fd = _audit_fds.get(path)
+    if fd is None:
+        fd = _audit_fds[path] = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        atexit.register(os.close, fd)
+    os.write(fd, text.encode())
+
+
+# Full tracebacks are only formatted once a minute per error signature:
+# walking and rendering the stack for every tick of a sustained failure
+# (e.g. an API outage touching every position) is pure overhead
+ERROR_TRACEBACK_INTERVAL = 60  # seconds
+_seen_errors = {}
+
+
+def _log_error(path, prefix, exc):
+    """Appends an error entry, with the full traceback at most once per
+    minute per signature; repeats get the one-line summary."""
+    sig = f"{type(exc).__name__}:{str(exc)[:80]}"
+    now = time.monotonic()
+    last = _seen_errors.get(sig)
+    if last is None or now - last >= ERROR_TRACEBACK_INTERVAL:
+        if len(_seen_errors) >= 1024:
+            # Signatures embed the exception text, so a storm of errors with
+            # varying ids would grow the dict without bound; drop entries
+            # whose dedup window already lapsed (clear outright if somehow
+            # all are still hot — worst case is one extra traceback each)
+            cutoff = now - ERROR_TRACEBACK_INTERVAL
+            for stale in [s for s, t in _seen_errors.items() if t < cutoff]:
+                del _seen_errors[stale]
+            if len(_seen_errors) >= 1024:
+                _seen_errors.clear()
+        _seen_errors[sig] = now
+        detail = traceback.format_exc()
+    else:
+        detail = sig
+    _append_log(path, f"{prefix}\n{detail}\n\n")
+
+
+def execute_order(ticker, shares, reason, action="sell", market=None):
     """Executes live order for trading with robust parameters.
     
     For CLOSING positions:
@@ -269,13 +647,18 @@ def execute_order(ticker, shares, reason, action="sell"):
     For OPENING positions:
     - Buy: Buy YES at ask price
     - Sell/Short: Sell YES at bid price (creates short)
+
+    Pass a market fetched this tick to skip the extra round-trip; when
+    omitted (or possibly stale) the market is fetched fresh so the limit
+    price is current.
     """
     if client is None:
         console.print(f"[red]X No Kalshi client available[/red]")
         return False
     try:
-        # Get market data
-        market = client.get_market(ticker).market
+        # Get market data unless the caller just fetched it
+        if market is None:
+            market = client.get_market(ticker).market
         
         if action == "sell":
             # Sell YES shares at the bid price
@@ -309,28 +692,55 @@ def execute_order(ticker, shares, reason, action="sell"):
         console.print(f"[green]LIVE {action_str} {ticker} {shares} @ ${yes_price} — {reason}[/green]")
         
         # Log to file
-        with open("successful_orders.log", "a") as f:
-            f.write(f"{datetime.datetime.now()} - Order ID: {order_id}, Ticker: {ticker}, Shares: {shares}, Action: {action_str}, Reason: {reason}\n")
+        _append_log("successful_orders.log",
+                    f"{datetime.datetime.now()} - Order ID: {order_id}, Ticker: {ticker}, Shares: {shares}, Action: {action_str}, Reason: {reason}\n")
         
         return True
     except Exception as e:
         # Log error silently to avoid spamming console
-        import traceback
-        error_msg = str(e)
-        with open("order_errors.log", "a") as f:
-            f.write(f"{datetime.datetime.now()} - Ticker: {ticker}, Action: {reason}\n")
-            f.write(f"Error: {error_msg}\n")
-            f.write(traceback.format_exc() + "\n\n")
+        _log_error("order_errors.log",
+                   f"{datetime.datetime.now()} - Ticker: {ticker}, Action: {reason}\n"
+                   f"Error: {str(e)[:200]}", e)
         # Don't print to console to avoid disrupting Live display
         return False
 
 
-def calculate_stop_loss(entry, current_bid):
+def calculate_stop_loss(entry):
     """Calculate stop loss with percentage and floor."""
     percent_stop = entry * (1 - STOP_LOSS_PERCENT)
     return max(percent_stop, STOP_LOSS_FLOOR)
 
 
+# The stop price depends only on the entry, so compute it once per position
+# (re-deriving if the entry moves, e.g. after adding shares) instead of per tick
+_stop_price_cache = {}
+
+
+def ttl_cache(ttl):
+    """Caches a function's results for ttl seconds, keyed by its arguments.
+
+    The dashboard refreshes every second but balances/orders/pending markets
+    rarely change that fast; call wrapped.invalidate() after a mutation (e.g.
+    canceling orders) to force the next call through.
+    """
+    def decorator(fn):
+        cache = {}
+
+        def wrapped(*args):
+            now = time.monotonic()
+            hit = cache.get(args)
+            if hit is not None and now - hit[0] < ttl:
+                return hit[1]
+            result = fn(*args)
+            cache[args] = (now, result)
+            return result
+
+        wrapped.invalidate = cache.clear
+        return wrapped
+    return decorator
+
+
+@ttl_cache(5.0)
 def get_account_balance():
     """Fetch account balance from Kalshi."""
     try:
@@ -343,6 +753,7 @@ def get_account_balance():
         return None
 
 
+@ttl_cache(5.0)
 def get_all_open_orders():
     """Fetch all open orders."""
     try:
@@ -354,6 +765,21 @@ def get_all_open_orders():
         return []
 
 
+@ttl_cache(5.0)
+def get_pending_markets():
+    """Fetch markets whose outcome is pending settlement."""
+    pending = []
+    try:
+        if client is None:
+            return pending
+        for market in client.get_markets():
+            if hasattr(market, 'status') and market.status == 'PENDING':
+                pending.append(market)
+    except:
+        pass
+    return pending
+
+
 def cancel_order(order_id):
     """Cancel an open order by ID."""
     try:
@@ -365,76 +791,88 @@ def cancel_order(order_id):
         return False
 
 
-def should_execute_stop(ticker, current_bid, entry, hold_time):
-    """Multiple safety triggers for risk management."""
-    stop_price = calculate_stop_loss(entry, current_bid)
-    pnl_percent = ((current_bid - entry) / entry * 100) if entry > 0 else 0
-    
-    if hold_time < MIN_HOLD_TIME:
+def should_execute_stop(ticker, current_bid, entry, hold_time,
+                        _min_hold=MIN_HOLD_TIME,
+                        _time_stop=TIME_BASED_STOP_LOSS,
+                        _be_timer=BREAK_EVEN_TIMER):
+    """Multiple safety triggers for risk management.
+
+    The trailing defaults bind the config constants as locals (LOAD_FAST
+    instead of a global dict lookup on every tick per position).
+    """
+    if hold_time < _min_hold:
         return False, None
-    
+
+    # Every trigger level is a pure function of the entry, so the common path
+    # is just compares against cached prices — no divisions or multiplies
+    meta = _stop_price_cache.get(ticker)
+    if meta is None or meta[0] != entry:
+        if entry > 0:
+            meta = (entry, calculate_stop_loss(entry),
+                    entry * (1 - MAX_LOSS_PER_TRADE),  # max-loss price
+                    entry * 0.98, entry * 1.03)        # break-even band (-2%..+3%)
+        else:
+            # Degenerate entry (unknown cost): PnL reads as 0, so only the
+            # break-even timer can fire, matching the old pnl-based checks
+            meta = (entry, calculate_stop_loss(entry),
+                    float('-inf'), float('-inf'), float('inf'))
+        _stop_price_cache[ticker] = meta
+    _, stop_price, max_loss_price, be_low, be_high = meta
+
     # Standard stop loss
     if current_bid <= stop_price:
         return True, f"Stop Loss Hit (${current_bid:.2f} <= ${stop_price:.2f})"
-    
+
     # Emergency exit for big losses
-    if pnl_percent <= -MAX_LOSS_PER_TRADE * 100:
+    if current_bid <= max_loss_price:
+        pnl_percent = (current_bid - entry) / entry * 100
         return True, f"Max Loss Exceeded ({pnl_percent:.1f}%)"
-    
+
     # Time-based stop - if losing for 45+ min
-    if hold_time >= TIME_BASED_STOP_LOSS and pnl_percent < 0:
+    if hold_time >= _time_stop and current_bid < entry:
         return True, f"Time-Based Stop (Losing for {hold_time/60:.1f} min)"
-    
+
     # Break-even protection - after 30 min, exit if near break-even
-    if hold_time >= BREAK_EVEN_TIMER and pnl_percent >= -2 and pnl_percent <= 3:
+    if hold_time >= _be_timer and be_low <= current_bid <= be_high:
+        pnl_percent = ((current_bid - entry) / entry * 100) if entry > 0 else 0
         return True, f"Break-Even Exit ({pnl_percent:.1f}% PnL)"
-    
+
     return False, None
 
 
-def generate_dashboard(rows):
-    """Creates a detailed Rich Table dashboard with comprehensive market statistics."""
-    all_pnl, win_rate = get_stats()
-    account_balance = get_account_balance()
-    open_orders = get_all_open_orders()
-    
-    # Get all markets to identify pending outcomes
-    pending_markets = []
-    try:
-        if client:
-            markets = client.get_markets()
-            for market in markets:
-                if hasattr(market, 'status') and market.status == 'PENDING':
-                    pending_markets.append(market)
-    except:
-        pass
-    
-    # Dynamic color based on performance
-    if all_pnl >= 20:
-        p_color = "bold green"
-        perf_emoji = "^"
-    elif all_pnl >= 10:
-        p_color = "green"
-        perf_emoji = "+"
-    elif all_pnl >= 0:
-        p_color = "green"
-        perf_emoji = "OK"
-    elif all_pnl >= -10:
-        p_color = "yellow"
-        perf_emoji = "!"
-    else:
-        p_color = "red"
-        perf_emoji = "v"
-    
-    total_trades = len(rows)
-    profitable = sum(1 for r in rows if r['pnl'] > 0)
-    
-    # Build comprehensive header
-    balance_str = f"${account_balance:.2f}" if account_balance else "N/A"
-    orders_str = f"Resting Orders: {len(open_orders)} | Pending Markets: {len(pending_markets)}"
-    
-    stats_header = f"[cyan bold]LIVE[/cyan bold] | PnL: [{p_color}]{all_pnl:+.2f}%[/{p_color}] | Win: [cyan]{win_rate:.1f}%[/cyan] | Profit: [green]{profitable}[/green]/[dim]{total_trades}[/dim] | Bal: {balance_str} | {orders_str}"
-    
+# Header performance tiers: bisect over the thresholds picks the
+# (color, emoji) pair instead of walking an if/elif ladder per refresh
+_PERF_THRESHOLDS = (-10, 0, 10, 20)
+_PERF_STYLES = (
+    ("red", "v"),
+    ("yellow", "!"),
+    ("green", "OK"),
+    ("green", "+"),
+    ("bold green", "^"),
+)
+
+
+# Pre-parsed markup templates for the per-row color choices: pick by index,
+# format only the number, instead of rebuilding the tag wrapper per cell
+_PNL_TEMPLATES = (
+    "[red]{:+.1f}%[/red]",
+    "[green]{:+.1f}%[/green]",
+    "[bold green]{:+.1f}%[/bold green]",
+)
+_DEV_TEMPLATES = (
+    "[cyan]{:+.1f}%[/cyan]",
+    "[bold yellow]{:+.1f}%[/bold yellow]",
+)
+
+
+def _reset_table(table):
+    """Clears a Table's rows in place so the column skeleton can be reused."""
+    table.rows.clear()
+    for column in table.columns:
+        column._cells.clear()
+
+
+def _build_positions_table():
     table = Table(
         title="MEDIAN REGRESSION BOT - ACTIVE POSITIONS",
         title_style="bold white on blue",
@@ -444,7 +882,7 @@ def generate_dashboard(rows):
         expand=False,
         padding=(0, 1)
     )
-    
+
     table.add_column("Market", style="bold cyan", width=26)
     table.add_column("Entry $", justify="right", style="dim white", width=7)
     table.add_column("Median $", justify="right", style="cyan", width=8)
@@ -455,10 +893,77 @@ def generate_dashboard(rows):
     table.add_column("Spread", justify="right", style="yellow", width=9)
     table.add_column("Hold(m)", justify="right", style="dim", width=7)
     table.add_column("Status", justify="center", width=14)
+    return table
+
+
+def _build_orders_table():
+    table = Table(
+        title="RESTING ORDERS",
+        title_style="bold white on yellow",
+        border_style="bright_yellow",
+        header_style="bold yellow",
+        show_lines=False,
+        expand=False,
+        padding=(0, 1)
+    )
+
+    table.add_column("Market", style="bold yellow", width=26)
+    table.add_column("Action", justify="center", style="cyan", width=8)
+    table.add_column("Shares", justify="right", width=7)
+    table.add_column("Price $", justify="right", width=8)
+    table.add_column("Order ID", style="dim", width=20)
+    return table
+
+
+def _build_pending_table():
+    table = Table(
+        title="OUTCOME PENDING",
+        title_style="bold white on magenta",
+        border_style="bright_magenta",
+        header_style="bold magenta",
+        show_lines=False,
+        expand=False,
+        padding=(0, 1)
+    )
+
+    table.add_column("Event", style="bold magenta", width=30)
+    table.add_column("Close Time", justify="center", style="cyan", width=16)
+    table.add_column("Yes Price", justify="right", width=8)
+    return table
+
+
+# Build each table/panel skeleton once; refreshes only swap the row contents
+# (and the panel title) instead of reconstructing columns and styles per tick
+_positions_table = _build_positions_table()
+_orders_table = _build_orders_table()
+_pending_table = _build_pending_table()
+_positions_panel = Panel(_positions_table, title="", border_style="blue", padding=(0, 1))
+
+
+def generate_dashboard(rows):
+    """Creates a detailed Rich Table dashboard with comprehensive market statistics."""
+    all_pnl, win_rate = get_stats()
+    account_balance = get_account_balance()
+    open_orders = get_all_open_orders()
+    pending_markets = get_pending_markets()
     
+    # Dynamic color based on performance
+    p_color, perf_emoji = _PERF_STYLES[bisect_right(_PERF_THRESHOLDS, all_pnl)]
+    
+    total_trades = len(rows)
+
+    table = _positions_table
+    _reset_table(table)
+
+    # Single pass over the rows: render each one and tally the profitable
+    # count as we go instead of scanning the list a second time
+    profitable = 0
     for r in rows:
-        pnl_color = "bold green" if r['pnl'] >= 10 else ("green" if r['pnl'] > 0 else "red")
-        dev_color = "bold yellow" if abs(r['dev']) >= DEVIATION_THRESHOLD_PCT else "cyan"
+        pnl = r['pnl']
+        if pnl > 0:
+            profitable += 1
+        pnl_cell = _PNL_TEMPLATES[2 if pnl >= 10 else (1 if pnl > 0 else 0)].format(pnl)
+        dev_cell = _DEV_TEMPLATES[abs(r['dev']) >= DEVIATION_THRESHOLD_PCT].format(r['dev'])
         
         # Spread display
         spread = r.get('spread', 0)
@@ -467,40 +972,34 @@ def generate_dashboard(rows):
         spread_str = f"${bid:.2f}-{ask:.2f}" if bid > 0 and ask > 0 else "N/A"
         
         table.add_row(
-            f"{r['title'][:26]}",
-            f"${r['entry']:.2f}",
+            r['title_str'],
+            r['entry_str'],
             f"${r['median']:.2f}",
             f"${r['now']:.2f}",
             r['sparkline'],
-            f"[{dev_color}]{r['dev']:+.1f}%[/{dev_color}]",
-            f"[{pnl_color}]{r['pnl']:+.1f}%[/{pnl_color}]",
+            dev_cell,
+            pnl_cell,
             spread_str,
             f"{r['hold_min']:.1f}",
             r['status']
         )
     
+    # Build comprehensive header
+    balance_str = f"${account_balance:.2f}" if account_balance else "N/A"
+    orders_str = f"Resting Orders: {len(open_orders)} | Pending Markets: {len(pending_markets)}"
+
+    stats_header = f"[cyan bold]LIVE[/cyan bold] | PnL: [{p_color}]{all_pnl:+.2f}%[/{p_color}] | Win: [cyan]{win_rate:.1f}%[/cyan] | Profit: [green]{profitable}[/green]/[dim]{total_trades}[/dim] | Bal: {balance_str} | {orders_str}"
+
     # Build output with positions table and additional sections
-    output = Panel(table, title=stats_header, border_style="blue", padding=(0, 1))
+    output = _positions_panel
+    output.title = stats_header
     tables_list = [output]
-    
+
     # Add resting orders section if there are any
     if open_orders and len(open_orders) > 0:
-        orders_table = Table(
-            title="RESTING ORDERS",
-            title_style="bold white on yellow",
-            border_style="bright_yellow",
-            header_style="bold yellow",
-            show_lines=False,
-            expand=False,
-            padding=(0, 1)
-        )
-        
-        orders_table.add_column("Market", style="bold yellow", width=26)
-        orders_table.add_column("Action", justify="center", style="cyan", width=8)
-        orders_table.add_column("Shares", justify="right", width=7)
-        orders_table.add_column("Price $", justify="right", width=8)
-        orders_table.add_column("Order ID", style="dim", width=20)
-        
+        orders_table = _orders_table
+        _reset_table(orders_table)
+
         for order in open_orders[:10]:  # Show max 10 orders
             try:
                 ticker = getattr(order, 'ticker', 'N/A')
@@ -529,20 +1028,9 @@ def generate_dashboard(rows):
     
     # Add outcome pending section if there are any
     if pending_markets and len(pending_markets) > 0:
-        pending_table = Table(
-            title="OUTCOME PENDING",
-            title_style="bold white on magenta",
-            border_style="bright_magenta",
-            header_style="bold magenta",
-            show_lines=False,
-            expand=False,
-            padding=(0, 1)
-        )
-        
-        pending_table.add_column("Event", style="bold magenta", width=30)
-        pending_table.add_column("Close Time", justify="center", style="cyan", width=16)
-        pending_table.add_column("Yes Price", justify="right", width=8)
-        
+        pending_table = _pending_table
+        _reset_table(pending_table)
+
         for market in pending_markets[:15]:  # Show max 15 pending markets
             try:
                 title = getattr(market, 'title', 'N/A')[:30]
@@ -580,87 +1068,186 @@ def generate_dashboard(rows):
     return output
 
 
+# Prebuilt sort key: itemgetter is C-implemented, and sorting in place skips
+# allocating a fresh list (and lambda) every refresh
+_pnl_key = operator.itemgetter('pnl')
+
+
+def cancel_all_orders():
+    """Cancels every open order and reports the tally."""
+    open_orders = get_all_open_orders()
+    canceled = 0
+    for order in open_orders:
+        order_id = getattr(order, 'order_id', None)
+        if order_id and cancel_order(order_id):
+            canceled += 1
+    get_all_open_orders.invalidate()
+    console.print(f"[yellow]X Canceled {canceled}/{len(open_orders)} orders[/yellow]")
+
+
 def main_loop():
     """Main trading loop with robust position tracking."""
-    global manual_sell_requested, manual_sell_ticker
-    price_hist = {}
-    entry_times = {}
-    highest_prices = {}
-    last_prices = {}
-    known_positions = {}
+    # Bind the hot config globals and clock calls to locals once; inside the
+    # per-tick loop these resolve with LOAD_FAST instead of dict lookups
+    rolling_window = ROLLING_WINDOW
+    deviation_threshold = DEVIATION_THRESHOLD_PCT
+    meta_ttl = MARKET_META_TTL
+    refresh_rate = REFRESH_RATE
+    monotonic = time.monotonic
+    sleep = time.sleep
+
+    positions = {}  # ticker -> PositionState
+    known_positions = set()
     sold_positions = set()  # Track positions that have been sold to prevent duplicates
-    
+    market_meta = {}  # ticker -> (market, fetched_at); reconciled every MARKET_META_TTL
+    display_cache = {}  # position_key -> preformatted title/entry strings
+    last_fingerprint = None  # skip re-rendering when nothing visible changed
+    last_render = 0.0  # but force a refresh periodically so the header stays live
+    # Market lookups are network-bound, so fan them out instead of paying one
+    # serial round-trip per position per tick
+    market_pool = ThreadPoolExecutor(max_workers=16)
+
     with Live(generate_dashboard([]), refresh_per_second=1, screen=True) as live:
         while True:
             rows = []
             try:
+                # Drain keyboard commands queued since the last tick (before
+                # the client check, so 'q' also exits the retry loop)
+                sell_all = False
+                quit_requested = False
+                try:
+                    while True:
+                        cmd = cmd_q.get_nowait()
+                        if cmd == "sell_all":
+                            sell_all = True
+                        elif cmd == "cancel_orders":
+                            cancel_all_orders()
+                        elif cmd == "quit":
+                            quit_requested = True
+                except queue.Empty:
+                    pass
+                if quit_requested:
+                    console.print("[yellow]Stopped by user[/yellow]")
+                    break
+
                 if client is None:
                     console.print("[red]No Kalshi client; retrying in 5s...[/red]")
-                    time.sleep(5)
+                    sleep(5)
                     continue
 
                 resp = client.get_positions()
                 # Only use market_positions for tracking - event_positions have different ticker format
                 all_pos = getattr(resp, 'market_positions', []) or []
-                now = time.time()
+                # Monotonic clock: hold times and cache ages are intervals, so
+                # an NTP step can't fire a time-based stop or stale a cache
+                now = monotonic()
+
+                if all_pos and _pos_ticker is None:
+                    _bind_position_getters(all_pos[0])
                 
+                # Collect active positions, then fetch all their markets
+                # concurrently so the refresh costs ~one round-trip, not N
+                active = []
                 for pos in all_pos:
                     shares = abs(int(getattr(pos, 'position', 0)))
-                    
+
                     # Skip closed positions
                     if shares <= 0:
                         continue
-                    
-                    ticker = getattr(pos, 'ticker', getattr(pos, 'event_ticker', 'Unknown'))
-                    market = client.get_market(ticker).market
-                    current = float(market.yes_bid_dollars)
-                    yes_ask = float(getattr(market, 'yes_ask_dollars', current))
-                    cost = getattr(pos, 'market_exposure', getattr(pos, 'total_cost', 0))
+
+                    ticker = _pos_ticker(pos)
+                    active.append((pos, shares, ticker))
+
+                update_ws_tickers(ticker for _, _, ticker in active)
+                # Only hit REST for tickers whose cached metadata is stale or
+                # that have no fresh streamed quote; unchanged positions ride
+                # on the cache + WebSocket feed
+                market_futures = {}
+                quotes = {}
+                for _, _, ticker in active:
+                    # Snapshot the streamed quote once per ticker so the fetch
+                    # decision and the price below can't disagree if it goes
+                    # stale mid-tick
+                    quote = quotes[ticker] = get_ws_quote(ticker)
+                    cached = market_meta.get(ticker)
+                    if (cached is None or now - cached[1] >= meta_ttl
+                            or quote is None):
+                        market_futures[ticker] = market_pool.submit(client.get_market, ticker)
+
+                for pos, shares, ticker in active:
+                    fut = market_futures.get(ticker)
+                    if fut is not None:
+                        market = fut.result().market
+                        market_meta[ticker] = (market, now)
+                    else:
+                        market = market_meta[ticker][0]
+                    # Only hand a market fetched this tick to execute_order;
+                    # a cached one could price the limit order stale
+                    fresh_market = market if fut is not None else None
+                    # Prefer the push-driven quote when it's fresh; REST is the
+                    # fallback (and the only path without websockets)
+                    quote = quotes[ticker]
+                    if quote is not None:
+                        current, yes_ask = quote
+                    else:
+                        current = float(market.yes_bid_dollars)
+                        yes_ask = float(getattr(market, 'yes_ask_dollars', current))
+                    cost = _pos_cost(pos)
                     entry = (cost / shares / 100) if shares > 0 else 0  # cost is in cents
                     
                     # Initialize tracking
-                    if ticker not in price_hist:
-                        price_hist[ticker] = deque(maxlen=ROLLING_WINDOW)
-                    if ticker not in entry_times:
-                        entry_times[ticker] = now
-                    if ticker not in highest_prices:
-                        highest_prices[ticker] = current
-                    
+                    st = positions.get(ticker)
+                    if st is None:
+                        st = positions[ticker] = PositionState(
+                            rolling=RollingMedian(rolling_window),
+                            entry_time=now,
+                            peak=current,
+                        )
+
                     # Update price history
-                    price_hist[ticker].append(current)
-                    med = median(list(price_hist[ticker])) if len(price_hist[ticker]) >= 3 else current
-                    
+                    st.rolling.push(current)
+                    med = st.rolling.median() if len(st.rolling) >= 3 else current
+
                     # Calculate dynamic threshold based on volatility
-                    dynamic_threshold = calculate_dynamic_threshold(list(price_hist[ticker]))
+                    dynamic_threshold = calculate_dynamic_threshold(st.rolling)
                     
                     dev_pct = (current - med) / med * 100 if med != 0 else 0.0
                     pnl = ((current - entry) / entry * 100) if entry > 0 else 0.0
-                    hold_sec = now - entry_times[ticker]
+                    hold_sec = now - st.entry_time
                     
                     # Track peak
-                    if current > highest_prices[ticker]:
-                        highest_prices[ticker] = current
-                    peak = highest_prices[ticker]
+                    if current > st.peak:
+                        st.peak = current
+                    peak = st.peak
                     
                     # Log new position
                     position_key = f"{ticker}_{shares}"
+
+                    # Title and entry never change for the life of a position,
+                    # so format them once instead of per refresh
+                    disp = display_cache.get(position_key)
+                    if disp is None:
+                        disp = display_cache[position_key] = {
+                            'title': market.title[:26],
+                            'entry': f"${entry:.2f}",
+                        }
                     if position_key not in known_positions:
                         # Only log as "new" if meets entry criteria, but still track it
                         if is_market_active_for_entry(market) and is_market_liquid(market, current, yes_ask):
-                            known_positions[position_key] = True
+                            known_positions.add(position_key)
                             log_new_position(ticker, market.title, entry, shares)
                         else:
                             # Mark as known to prevent re-logging, even if doesn't meet entry criteria
-                            known_positions[position_key] = True
+                            known_positions.add(position_key)
                     
                     # Median reversion sell logic
                     sold = False
                     reason = None
                     
                     # Manual sell override
-                    if manual_sell_requested and position_key not in sold_positions:
+                    if sell_all and position_key not in sold_positions:
                         reason = "Manual sell triggered"
-                        if execute_order(ticker, shares, reason, action="sell"):
+                        if execute_order(ticker, shares, reason, action="sell", market=fresh_market):
                             log_trade(ticker, market.title, entry, current, pnl, reason)
                             sold_positions.add(position_key)
                             sold = True
@@ -668,7 +1255,7 @@ def main_loop():
                     # Automatic median reversion sell logic (if not manually sold)
                     if not sold and position_key not in sold_positions and dev_pct >= dynamic_threshold and pnl > 0:
                         reason = f"Median reversion +{dynamic_threshold:.2f}% deviation"
-                        if execute_order(ticker, shares, reason, action="sell"):
+                        if execute_order(ticker, shares, reason, action="sell", market=fresh_market):
                             log_trade(ticker, market.title, entry, current, pnl, reason)
                             sold_positions.add(position_key)
                             sold = True
@@ -677,21 +1264,21 @@ def main_loop():
                     if position_key not in sold_positions:
                         should_stop, stop_reason = should_execute_stop(ticker, current, entry, hold_sec)
                         if should_stop:
-                            if execute_order(ticker, shares, stop_reason, action="sell"):
+                            if execute_order(ticker, shares, stop_reason, action="sell", market=fresh_market):
                                 log_trade(ticker, market.title, entry, current, pnl, stop_reason)
                                 sold_positions.add(position_key)
                                 sold = True
                     
                     if sold:
-                        if ticker in price_hist:
-                            del price_hist[ticker]
-                        if ticker in entry_times:
-                            del entry_times[ticker]
+                        positions.pop(ticker, None)
+                        market_meta.pop(ticker, None)
+                        display_cache.pop(position_key, None)
+                        _stop_price_cache.pop(ticker, None)
                         # Don't delete from known_positions — keeps it from logging as "new" again
                         continue
                     
                     # Get sparkline
-                    spark = get_sparkline(list(price_hist[ticker]))
+                    spark = get_sparkline(st.rolling)
                     
                     # Calculate bid-ask spread
                     bid = market.yes_bid_dollars if market.yes_bid_dollars else 0
@@ -699,15 +1286,15 @@ def main_loop():
                     spread = ask - bid if bid > 0 else 0
                     
                     # Determine status with momentum indicator
-                    if abs(dev_pct) >= DEVIATION_THRESHOLD_PCT:
+                    if abs(dev_pct) >= deviation_threshold:
                         status = "[bold yellow]! THRESHOLD[/bold yellow]" if dev_pct < 0 else "[bold green]OK READY[/bold green]"
                     else:
                         status = "[cyan]~ Tracking[/cyan]"
                     
                     rows.append({
                         "ticker": ticker,
-                        "title": market.title,
-                        "entry": entry,
+                        "title_str": disp['title'],
+                        "entry_str": disp['entry'],
                         "now": current,
                         "median": med,
                         "dev": dev_pct,
@@ -721,25 +1308,35 @@ def main_loop():
                         "ask": ask,
                     })
 
-                rows = sorted(rows, key=lambda x: x['pnl'], reverse=True)
-                live.update(generate_dashboard(rows))
-                
-                # Reset manual sell flag after processing
-                if manual_sell_requested:
-                    manual_sell_requested = False
-                
-                time.sleep(REFRESH_RATE)
+                _flush_log_rows()
+                rows.sort(key=_pnl_key, reverse=True)
+
+                # Rendering is pure waste when prices/PnL/status are all
+                # unchanged, so fingerprint the visible state and skip
+                fingerprint = hash(tuple(
+                    (r['ticker'], r['now'], r['pnl'], r['status']) for r in rows))
+                # Force a render every 10s regardless, so header-only changes
+                # (balance, resting orders, win rate) still show up
+                if fingerprint != last_fingerprint or now - last_render >= 10:
+                    # The table skeletons handed to Live are shared objects
+                    # that generate_dashboard mutates in place; Rich's refresh
+                    # thread renders them concurrently, so rebuild under the
+                    # Live lock (an RLock, also taken by live.update/refresh)
+                    # or a mid-render rows.clear() raises in the render thread
+                    with live._lock:
+                        live.update(generate_dashboard(rows))
+                    last_fingerprint = fingerprint
+                    last_render = now
+
+                sleep(refresh_rate)
 
             except KeyboardInterrupt:
                 console.print("[yellow]Stopped by user[/yellow]")
                 break
             except Exception as e:
                 # Log error silently to avoid disrupting Live display
-                import traceback
-                with open("error.log", "a") as f:
-                    f.write(f"{datetime.datetime.now()} - Error: {str(e)}\n")
-                    f.write(traceback.format_exc() + "\n")
-                time.sleep(1)
+                _log_error("error.log", f"{datetime.datetime.now()} - Error: {str(e)[:200]}", e)
+                sleep(1)
 
 
 if __name__ == "__main__":